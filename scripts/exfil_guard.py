@@ -11,13 +11,32 @@ Output: JSON with hookSpecificOutput containing permissionDecision, or {} to all
 Fail-open: any parse error or exception outputs {} so legitimate work is never blocked.
 """
 
-import json
+import hashlib
 import math
 import os
+import pickle
 import re
 import sys
+import tempfile
+from collections import Counter
 from pathlib import Path
-from urllib.parse import parse_qs, urlparse
+from urllib.parse import unquote_plus, urlparse
+
+from guardian_client import dumps as _dumps, loads as _loads, query_daemon
+
+# numpy turns the entropy histogram into a single C loop for long tokens;
+# fall back to Counter (also C-implemented) when it is not installed.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# hyperscan compiles all secret patterns into one SIMD-accelerated DFA;
+# fall back to the fused re alternation when it is not installed.
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
 
 
 def get_plugin_dir() -> Path:
@@ -28,16 +47,114 @@ def get_plugin_dir() -> Path:
     return Path(__file__).parent.parent
 
 
+# Token boundaries for the entropy check, compiled once.
+_TOKEN_SPLIT = re.compile(r"[\s&?=,;|]+")
+
+# URL hosts and bare hostnames, extracted in one pass once an
+# exfil-capable command matches.
+_HOST_RE = re.compile(
+    r"https?://([^/\s'\"]+)|(?:^|\s)([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})"
+)
+
+
+def compile_config(config: dict) -> dict:
+    """Pre-compile every regex in the config so hook calls skip compilation.
+
+    Entries whose regex fails to compile are dropped here once instead of
+    being skipped via re.error on every scan.
+    """
+    for key in ("secret_patterns", "bash_exfil_commands"):
+        compiled = []
+        for pat in config.get(key, []):
+            try:
+                pat["_re"] = re.compile(pat["pattern"])
+            except (re.error, KeyError):
+                continue
+            compiled.append(pat)
+        config[key] = compiled
+
+    # Fuse the secret patterns into one alternation so each text is
+    # scanned in a single pass; Match.lastgroup maps back to the entry.
+    secret_patterns = config.get("secret_patterns", [])
+    if secret_patterns:
+        try:
+            config["_secret_combined_re"] = re.compile(
+                "|".join(
+                    f"(?P<p{i}>{pat['pattern']})"
+                    for i, pat in enumerate(secret_patterns)
+                )
+            )
+            config["_secret_by_group"] = {
+                f"p{i}": pat for i, pat in enumerate(secret_patterns)
+            }
+        except re.error:
+            pass
+
+    # Set of lowered blocklist domains; hostname checks walk the label
+    # suffixes against it instead of comparing every configured domain.
+    config["_suspicious_set"] = frozenset(
+        d.lower() for d in config.get("suspicious_domains", [])
+    )
+    return config
+
+
+# Bump when compile_config changes the shape of the compiled config, so
+# pickles built by older code are not served.
+_CACHE_SCHEMA = 2
+
+
+def _cache_dir() -> Path:
+    """Per-user cache directory for pre-built config."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return Path(base) / "ccg"
+
+
 def load_config() -> dict:
-    """Load exfiltration detection config from reference/exfil-patterns.json."""
+    """Load exfiltration detection config from reference/exfil-patterns.json.
+
+    The compiled config is pickled to the user cache keyed by the source
+    file's mtime, so steady-state hook processes skip the JSON parse and
+    config compilation. Any cache problem falls back to a fresh build.
+    """
     config_file = get_plugin_dir() / "reference" / "exfil-patterns.json"
-    if not config_file.exists():
+    try:
+        st = config_file.stat()
+    except OSError:
         return {}
+
+    # The digest of the source path keeps multiple plugin checkouts on one
+    # machine from evicting (or worse, serving) each other's entries in
+    # the shared cache directory.
+    path_digest = hashlib.sha256(str(config_file).encode()).hexdigest()[:12]
+    cache_file = _cache_dir() / (
+        f"exfil-patterns.{path_digest}.v{_CACHE_SCHEMA}.{st.st_mtime_ns}.pkl"
+    )
+    try:
+        with cache_file.open("rb") as f:
+            return pickle.load(f)
+    except Exception:
+        pass
+
     try:
-        return json.loads(config_file.read_text())
-    except (json.JSONDecodeError, OSError):
+        config = compile_config(_loads(config_file.read_bytes()))
+    except (ValueError, OSError):
         return {}
 
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        for stale in cache_file.parent.glob(f"exfil-patterns.{path_digest}.*.pkl"):
+            if stale != cache_file:
+                stale.unlink(missing_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_file.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(config, f)
+        os.replace(tmp_path, cache_file)
+    except Exception:
+        pass
+    return config
+
 
 def deny(reason: str) -> dict:
     """Build a PreToolUse deny response."""
@@ -51,42 +168,132 @@ def deny(reason: str) -> dict:
 
 
 def shannon_entropy(s: str) -> float:
-    """Compute Shannon entropy of a string in bits per character."""
+    """Compute Shannon entropy of a string in bits per character.
+
+    Long tokens are histogrammed over their UTF-8 bytes with numpy when
+    available (one vectorized reduction instead of per-char bytecode);
+    short tokens use Counter, which beats the numpy setup cost.
+    """
     if not s:
         return 0.0
-    freq: dict[str, int] = {}
-    for ch in s:
-        freq[ch] = freq.get(ch, 0) + 1
+    if np is not None and len(s) >= 64:
+        data = np.frombuffer(s.encode("utf-8"), dtype=np.uint8)
+        counts = np.bincount(data, minlength=256)
+        probs = counts[counts > 0] / data.size
+        return float(-(probs * np.log2(probs)).sum())
     length = len(s)
-    return -sum((c / length) * math.log2(c / length) for c in freq.values())
+    return -sum(
+        (count / length) * math.log2(count / length)
+        for count in Counter(s).values()
+    )
+
 
+# Hyperscan databases keyed by the tuple of pattern strings. Built lazily
+# (and kept out of the pickled config — databases don't pickle); None
+# records that compilation failed so the regex path is used instead.
+_hs_cache: dict[tuple[str, ...], "object | None"] = {}
 
-def scan_secret_patterns(text: str, patterns: list[dict]) -> dict | None:
-    """Scan text against secret patterns. Returns first match or None."""
-    for pat in patterns:
+
+def _hyperscan_db(patterns: list[dict]) -> "object | None":
+    """Build or fetch the Hyperscan database for the secret patterns."""
+    key = tuple(pat["pattern"] for pat in patterns)
+    if key not in _hs_cache:
         try:
-            if re.search(pat["pattern"], text):
-                return pat
-        except re.error:
-            continue
+            db = hyperscan.Database()
+            db.compile(
+                expressions=[pat["pattern"].encode() for pat in patterns],
+                ids=list(range(len(patterns))),
+                flags=[hyperscan.HS_FLAG_SINGLEMATCH] * len(patterns),
+            )
+            _hs_cache[key] = db
+        except Exception:
+            _hs_cache[key] = None
+    return _hs_cache[key]
+
+
+def scan_secret_patterns(text: str, config: dict) -> dict | None:
+    """Scan text against secret patterns. Returns first match or None.
+
+    Prefers a Hyperscan database (single SIMD DFA pass over all patterns)
+    when the module is installed, then the fused re alternation, then
+    per-pattern scanning.
+    """
+    patterns = config.get("secret_patterns", [])
+    if hyperscan is not None and patterns:
+        db = _hyperscan_db(patterns)
+        if db is not None:
+            matched: list[int] = []
+
+            def on_match(pat_id, start, end, flags, context):
+                matched.append(pat_id)
+                return 1  # stop at the first match
+
+            scan_ok = True
+            try:
+                db.scan(text.encode("utf-8"), match_event_handler=on_match)
+            except Exception:
+                # The early-stop termination lands here too; a recorded
+                # match is still valid. A genuine scan failure with no
+                # match falls through to the regex path below.
+                scan_ok = bool(matched)
+            if matched:
+                return patterns[matched[0]]
+            if scan_ok:
+                return None
+
+    combined = config.get("_secret_combined_re")
+    if combined is not None:
+        match = combined.search(text)
+        if match is None:
+            return None
+        return config["_secret_by_group"][match.lastgroup]
+    for pat in config.get("secret_patterns", []):
+        if pat["_re"].search(text):
+            return pat
     return None
 
 
-def check_entropy(text: str, threshold: float, min_length: int) -> str | None:
-    """Check tokens in text for high entropy. Returns the flagged token or None."""
-    tokens = re.split(r"[\s&?=,;|]+", text)
-    for token in tokens:
-        if len(token) >= min_length and shannon_entropy(token) >= threshold:
-            return token
-    return None
+_ALPHA_ONLY = re.compile(r"[a-z]+")
 
 
-def check_suspicious_domain(hostname: str, domains: list[str]) -> str | None:
-    """Check if hostname matches a suspicious domain. Returns the domain or None."""
-    hostname_lower = hostname.lower()
-    for domain in domains:
-        if hostname_lower == domain or hostname_lower.endswith("." + domain):
-            return domain
+def check_entropy(text: str, threshold: float, min_length: int) -> str | None:
+    """Check tokens in text for high entropy. Returns the flagged token or None.
+
+    Entropy is bounded by log2 of the number of distinct characters, so a
+    token with fewer than 2**threshold distinct characters can never be
+    flagged — a cheap set() check kills most ordinary tokens before the
+    histogram runs. Pure lowercase tokens cap at log2(26) ~= 4.70 bits and
+    are skipped outright when the threshold is above that.
+    """
+    min_distinct = 2.0 ** threshold
+    skip_alpha = threshold > math.log2(26)
+    return next(
+        (
+            token
+            for token in _TOKEN_SPLIT.split(text)
+            if len(token) >= min_length
+            and len(set(token)) >= min_distinct
+            and not (skip_alpha and _ALPHA_ONLY.fullmatch(token))
+            and shannon_entropy(token) >= threshold
+        ),
+        None,
+    )
+
+
+def check_suspicious_domain(hostname: str, config: dict) -> str | None:
+    """Check if hostname matches a suspicious domain. Returns the domain or None.
+
+    Probes the hostname's label suffixes against the set built at config
+    load: O(labels) lookups regardless of blocklist size.
+    """
+    suspicious = config.get("_suspicious_set")
+    if not suspicious:
+        return None
+    parts = hostname.lower().split(".")
+    for i in range(len(parts)):
+        suffix = ".".join(parts[i:])
+        if suffix in suspicious:
+            return suffix
     return None
 
 
@@ -96,8 +303,7 @@ def check_websearch(tool_input: dict, config: dict) -> dict | None:
     if not query:
         return None
 
-    secret_patterns = config.get("secret_patterns", [])
-    match = scan_secret_patterns(query, secret_patterns)
+    match = scan_secret_patterns(query, config)
     if match:
         return deny(
             f"Exfiltration guard: WebSearch query contains a suspected secret "
@@ -127,34 +333,34 @@ def check_webfetch(tool_input: dict, config: dict) -> dict | None:
     except Exception:
         return None
 
-    suspicious_domains = config.get("suspicious_domains", [])
-    domain_match = check_suspicious_domain(parsed.hostname or "", suspicious_domains)
+    domain_match = check_suspicious_domain(parsed.hostname or "", config)
     if domain_match:
         return deny(
             f"Exfiltration guard: WebFetch URL targets suspicious domain "
             f"({domain_match}). Blocked to prevent data leakage."
         )
 
-    secret_patterns = config.get("secret_patterns", [])
-    match = scan_secret_patterns(url, secret_patterns)
+    match = scan_secret_patterns(url, config)
     if match:
         return deny(
             f"Exfiltration guard: WebFetch URL contains a suspected secret "
             f"({match['description']}). Blocked to prevent data leakage."
         )
 
+    # The entropy tokenizer already splits on &?=, so the decoded query
+    # string can be scanned in one pass without parse_qs allocating a
+    # dict of value lists. Decoding first matters: percent-encoding
+    # inflates token entropy and would flag ordinary URL-in-param values
+    # like OAuth redirect_uris.
     threshold = config.get("entropy_threshold", 4.0)
     min_length = config.get("entropy_min_length", 20)
-    query_params = parse_qs(parsed.query)
-    for param_name, values in query_params.items():
-        for val in values:
-            flagged = check_entropy(val, threshold, min_length)
-            if flagged:
-                return deny(
-                    f"Exfiltration guard: WebFetch URL query param '{param_name}' "
-                    f"contains a high-entropy value that may encode secrets. "
-                    f"Blocked to prevent data leakage."
-                )
+    flagged = check_entropy(unquote_plus(parsed.query), threshold, min_length)
+    if flagged:
+        return deny(
+            f"Exfiltration guard: WebFetch URL query string contains a "
+            f"high-entropy value ({flagged[:40]}...) that may encode secrets. "
+            f"Blocked to prevent data leakage."
+        )
 
     return None
 
@@ -165,8 +371,7 @@ def check_bash(tool_input: dict, config: dict) -> dict | None:
     if not command:
         return None
 
-    secret_patterns = config.get("secret_patterns", [])
-    match = scan_secret_patterns(command, secret_patterns)
+    match = scan_secret_patterns(command, config)
     if match:
         return deny(
             f"Exfiltration guard: Bash command contains a suspected secret "
@@ -175,64 +380,77 @@ def check_bash(tool_input: dict, config: dict) -> dict | None:
 
     bash_exfil = config.get("bash_exfil_commands", [])
     for exfil_cmd in bash_exfil:
-        try:
-            if re.search(exfil_cmd["pattern"], command):
-                suspicious_domains = config.get("suspicious_domains", [])
-                urls = re.findall(r"https?://([^/\s'\"]+)", command)
-                hostnames = re.findall(r"(?:\s|^)([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})", command)
-                all_hosts = urls + hostnames
-                for host in all_hosts:
-                    domain_match = check_suspicious_domain(host, suspicious_domains)
-                    if domain_match:
-                        return deny(
-                            f"Exfiltration guard: Bash command uses {exfil_cmd['description']} "
-                            f"targeting suspicious domain ({domain_match}). "
-                            f"Blocked to prevent data leakage."
-                        )
-
-                threshold = config.get("entropy_threshold", 4.0)
-                min_length = config.get("entropy_min_length", 20)
-                flagged = check_entropy(command, threshold, min_length)
-                if flagged:
+        if exfil_cmd["_re"].search(command):
+            # One combined scan yields both URL hosts and bare hostnames.
+            all_hosts = [
+                m.group(1) or m.group(2) for m in _HOST_RE.finditer(command)
+            ]
+            for host in all_hosts:
+                domain_match = check_suspicious_domain(host, config)
+                if domain_match:
                     return deny(
                         f"Exfiltration guard: Bash command uses {exfil_cmd['description']} "
-                        f"with a high-entropy argument ({flagged[:40]}...) that may encode "
-                        f"secrets. Blocked to prevent data leakage."
+                        f"targeting suspicious domain ({domain_match}). "
+                        f"Blocked to prevent data leakage."
                     )
-        except re.error:
-            continue
+
+            threshold = config.get("entropy_threshold", 4.0)
+            min_length = config.get("entropy_min_length", 20)
+            flagged = check_entropy(command, threshold, min_length)
+            if flagged:
+                return deny(
+                    f"Exfiltration guard: Bash command uses {exfil_cmd['description']} "
+                    f"with a high-entropy argument ({flagged[:40]}...) that may encode "
+                    f"secrets. Blocked to prevent data leakage."
+                )
 
     return None
 
 
+# Pre-encoded response for the overwhelmingly common allow path.
+_ALLOW = b"{}\n"
+
+
+def handle(input_data: dict) -> dict:
+    """Run the exfiltration checks for one hook invocation.
+
+    Shared between the per-call script path and the guardian daemon.
+    """
+    tool_name = input_data.get("tool_name", "")
+    tool_input = input_data.get("tool_input", {})
+
+    config = load_config()
+    if not config:
+        return {}
+
+    if tool_name == "WebSearch":
+        result = check_websearch(tool_input, config)
+    elif tool_name == "WebFetch":
+        result = check_webfetch(tool_input, config)
+    elif tool_name == "Bash":
+        result = check_bash(tool_input, config)
+    else:
+        result = None
+
+    return result if result else {}
+
+
 def main():
     """Main entry point for the hook."""
     try:
-        input_data = json.load(sys.stdin)
-
-        tool_name = input_data.get("tool_name", "")
-        tool_input = input_data.get("tool_input", {})
-
-        config = load_config()
-        if not config:
-            print(json.dumps({}))
-            return
-
-        if tool_name == "WebSearch":
-            result = check_websearch(tool_input, config)
-        elif tool_name == "WebFetch":
-            result = check_webfetch(tool_input, config)
-        elif tool_name == "Bash":
-            result = check_bash(tool_input, config)
-        else:
-            result = None
+        input_data = _loads(sys.stdin.buffer.read())
+
+        response = query_daemon("exfil_guard", input_data)
+        if response is None:
+            response = handle(input_data)
 
-        print(json.dumps(result if result else {}))
+        if response:
+            sys.stdout.write(_dumps(response) + "\n")
+        else:
+            sys.stdout.buffer.write(_ALLOW)
 
-    except json.JSONDecodeError:
-        print(json.dumps({}))
     except Exception:
-        print(json.dumps({}))
+        sys.stdout.buffer.write(_ALLOW)
 
 
 if __name__ == "__main__":
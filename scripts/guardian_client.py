@@ -0,0 +1,103 @@
+"""
+Shared daemon client for the Clean Code Guardian hook scripts.
+
+Each hook script forwards its payload to the long-lived guardian daemon
+when one is reachable, spawning it on first use and falling back to its
+own in-process check otherwise. The socket framing, spawn logic,
+unknown-hook handling, and JSON helpers live here so a protocol change
+cannot drift across the three scripts.
+
+Hook scripts are executed directly from this directory (and the daemon
+inserts it on sys.path), so a plain sibling import works everywhere.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# orjson parses/serializes several times faster than stdlib json; fall
+# back silently when it is not installed.
+try:
+    import orjson
+
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+
+    def loads(data):
+        return json.loads(data)
+
+    def dumps(obj) -> str:
+        return json.dumps(obj)
+
+
+def plugin_dir() -> Path:
+    """Get the plugin directory path via env var or relative path."""
+    env_root = os.environ.get("CLAUDE_PLUGIN_ROOT")
+    if env_root:
+        return Path(env_root)
+    return Path(__file__).parent.parent
+
+
+def _spawn_daemon(sock_path: Path) -> bool:
+    """Start guardian_daemon.py detached and wait briefly for its socket."""
+    daemon = Path(__file__).resolve().parent / "guardian_daemon.py"
+    if not daemon.exists():
+        return False
+    try:
+        subprocess.Popen(
+            [sys.executable, str(daemon)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError:
+        return False
+    for _ in range(20):
+        if sock_path.exists():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def query_daemon(hook: str, input_data: dict) -> "dict | None":
+    """Ask the long-lived guardian daemon, spawning it on first use.
+
+    Returns the daemon's response, or None when it cannot be reached so
+    the caller runs the check in-process. Set GUARDIAN_NO_DAEMON to skip
+    the daemon entirely.
+    """
+    if os.environ.get("GUARDIAN_NO_DAEMON") or not hasattr(socket, "AF_UNIX"):
+        return None
+    sock_path = plugin_dir() / "run" / "guardian.sock"
+    request = dumps({"hook": hook, "payload": input_data}).encode() + b"\n"
+    for attempt in (0, 1):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(3.0)
+                sock.connect(str(sock_path))
+                sock.sendall(request)
+                data = b""
+                while b"\n" not in data:
+                    chunk = sock.recv(65536)
+                    if not chunk:
+                        break
+                    data += chunk
+            response = loads(data)
+            # A daemon that predates a hook answers with an unknown-hook
+            # marker; run the check in-process instead.
+            if isinstance(response, dict) and response.get("unknownHook"):
+                return None
+            return response
+        except (OSError, ValueError):
+            if attempt == 0 and not _spawn_daemon(sock_path):
+                return None
+    return None
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Long-lived hook daemon for Clean Code Guardian.
+
+Hook scripts are normally spawned as a fresh python3 process per tool call,
+so interpreter startup and pattern compilation dominate their wall time.
+This daemon listens on a Unix socket under the plugin's run/ directory and
+serves hook requests from a warm process: compiled patterns and mtime-cached
+config stay in memory across thousands of invocations.
+
+The hook scripts connect, send one JSON line {"hook": name, "payload": ...},
+and read one JSON line back. They spawn the daemon on first use and fall
+back to in-process checking whenever it cannot be reached, so the daemon is
+purely an accelerator — never a point of failure.
+
+The daemon exits on its own after an idle period so it does not outlive the
+coding session by much.
+"""
+
+import socket
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import exfil_guard
+import guardian_client
+import pre_edit_validator
+import prompt_enricher
+
+HANDLERS = {
+    "exfil_guard": exfil_guard.handle,
+    "pre_edit_validator": pre_edit_validator.handle,
+    "prompt_enricher": prompt_enricher.handle,
+}
+
+# Seconds without a connection before the daemon shuts itself down.
+IDLE_TIMEOUT = 900.0
+
+
+def socket_path() -> Path:
+    """Socket location under the plugin's run/ directory."""
+    return pre_edit_validator.get_plugin_dir() / "run" / "guardian.sock"
+
+
+def serve_connection(conn: socket.socket) -> None:
+    """Read one framed JSON request from conn and write the response."""
+    conn.settimeout(5.0)
+    try:
+        data = b""
+        while b"\n" not in data:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+        request = guardian_client.loads(data)
+        handler = HANDLERS.get(request.get("hook", ""))
+        payload = request.get("payload", {})
+        # The explicit marker (rather than a bare {}) lets clients tell
+        # "daemon doesn't know this hook" apart from "allow" and run the
+        # check in-process instead.
+        response = handler(payload) if handler else {"unknownHook": True}
+    except Exception:
+        # Mirror the hook scripts' fail-open behavior.
+        response = {}
+    try:
+        conn.sendall(guardian_client.dumps(response).encode() + b"\n")
+    except OSError:
+        pass
+
+
+def main():
+    """Bind the socket and serve until idle."""
+    sock_path = socket_path()
+    sock_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # If another daemon already answers on the socket, we are redundant;
+    # otherwise the socket file is stale and can be replaced.
+    if sock_path.exists():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.settimeout(1.0)
+            probe.connect(str(sock_path))
+            return
+        except OSError:
+            sock_path.unlink(missing_ok=True)
+        finally:
+            probe.close()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(str(sock_path))
+    except OSError:
+        # Lost a startup race with another daemon instance.
+        return
+    server.listen(16)
+    server.settimeout(IDLE_TIMEOUT)
+
+    # Warm the config caches before the first request arrives.
+    exfil_guard.load_config()
+    pre_edit_validator.load_patterns()
+    prompt_enricher.load_intent_rules()
+
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                break
+            with conn:
+                serve_connection(conn)
+    finally:
+        server.close()
+        sock_path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
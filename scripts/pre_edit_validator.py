@@ -9,13 +9,44 @@ Input: JSON on stdin with tool_name, tool_input
 Output: JSON with hookSpecificOutput containing permissionDecision
 """
 
+import concurrent.futures
 import fnmatch
+import functools
 import json
 import os
 import re
 import sys
 from pathlib import Path
 
+from guardian_client import dumps as _dumps, loads as _loads, query_daemon
+
+# Content being validated is attacker-adjacent (LLM-generated code), so
+# prefer google-re2's linear-time engine when it is installed. Patterns it
+# rejects (e.g. lookahead in naive-datetime-now) fall back to stdlib re
+# per-pattern. The probe below also confirms the wrapper supports the named
+# groups and lastgroup access the fused scan relies on.
+try:
+    import re2
+except ImportError:
+    re2 = None
+if re2 is not None:
+    try:
+        _probe = re2.compile("(?P<a>x)|(?P<b>y)").search("y")
+        if _probe is None or _probe.lastgroup != "b":
+            re2 = None
+    except Exception:
+        re2 = None
+
+
+def compile_regex(pattern: str, flags: int = 0):
+    """Compile with re2 when available and the pattern is supported, else re."""
+    if re2 is not None:
+        try:
+            return re2.compile(pattern, flags)
+        except Exception:
+            pass
+    return re.compile(pattern, flags)
+
 
 def get_plugin_dir() -> Path:
     """Get the plugin directory path via env var or relative path."""
@@ -25,16 +56,169 @@ def get_plugin_dir() -> Path:
     return Path(__file__).parent.parent
 
 
+# Glob metacharacters; a "*.ext" glob without any of these in ext is a
+# plain extension match.
+_GLOB_META = re.compile(r"[*?\[\]]")
+
+_REPLACE_TZINFO = re.compile(r"\s*\.\s*replace\(tzinfo")
+
+
+def _check_naive_datetime(content: str) -> bool:
+    """True when content contains a real naive datetime.now() call.
+
+    Walks only the lines containing the literal call and inspects each
+    occurrence's own prefix for a preceding quote or comment marker,
+    instead of running a .*-prefixed exclusion regex over the whole
+    content. Calls immediately followed by .replace(tzinfo=...) are
+    already timezone-aware and are skipped.
+    """
+    if "datetime.now()" not in content:
+        return False
+    for line in content.split("\n"):
+        idx = line.find("datetime.now()")
+        while idx >= 0:
+            prefix = line[:idx]
+            rest = line[idx + len("datetime.now()"):]
+            if (
+                '"' not in prefix
+                and "'" not in prefix
+                and "#" not in prefix
+                and not _REPLACE_TZINFO.match(rest)
+            ):
+                return True
+            idx = line.find("datetime.now()", idx + 1)
+    return False
+
+
+# Rules checked by a Python handler instead of their regex; the handler
+# receives the content and returns whether the rule is violated.
+_HANDLERS = {
+    "naive-datetime-now": _check_naive_datetime,
+}
+
+
+def compile_patterns(patterns: list[dict]) -> list[dict]:
+    """Pre-compile each pattern's regexes so hook calls skip re-compilation.
+
+    Entries whose regex fails to compile are dropped rather than failing
+    every subsequent check.
+    """
+    compiled = []
+    for pattern_def in patterns:
+        try:
+            pattern_def["pattern_re"] = compile_regex(
+                pattern_def["pattern"], re.IGNORECASE | re.MULTILINE
+            )
+            exclude_pattern = pattern_def.get("exclude_pattern")
+            if exclude_pattern:
+                pattern_def["exclude_re"] = compile_regex(exclude_pattern, re.IGNORECASE)
+        except (re.error, KeyError):
+            continue
+        handler = _HANDLERS.get(pattern_def.get("id"))
+        if handler is not None:
+            pattern_def["handler"] = handler
+        # When every glob is a plain single-suffix "*.ext", file matching
+        # reduces to an O(1) extension lookup. Compound suffixes like
+        # "*.d.ts" must not take this path: splitext only yields the
+        # final suffix, so they go through the translated regex below.
+        file_globs = pattern_def.get("file_globs", [])
+        exts = [
+            os.path.normcase(g[1:])
+            for g in file_globs
+            if g.startswith("*.")
+            and "." not in g[2:]
+            and not _GLOB_META.search(g[2:])
+        ]
+        if file_globs and len(exts) == len(file_globs):
+            pattern_def["file_exts"] = frozenset(exts)
+        elif file_globs:
+            # Globs with metacharacters or compound suffixes: translate
+            # them once into a single alternation instead of fnmatch (and
+            # its per-call translate cache lookup) per glob per
+            # invocation.
+            try:
+                pattern_def["file_globs_re"] = re.compile(
+                    "|".join(fnmatch.translate(os.path.normcase(g)) for g in file_globs)
+                )
+            except re.error:
+                pass
+        # Required substrings (checked case-insensitively) that let the
+        # scan skip the regex engine when the content can't possibly match.
+        pattern_def["literals_lower"] = tuple(
+            lit.lower() for lit in pattern_def.get("literals", ())
+        )
+        compiled.append(pattern_def)
+    return compiled
+
+
+# Fused alternations keyed by the tuple of member pattern strings. A None
+# value records that the fusion failed to compile (e.g. duplicate group
+# names inside member patterns) so we fall back to per-pattern scanning.
+_fused_cache: dict[tuple[str, ...], "re.Pattern | None"] = {}
+
+
+def fuse_patterns(pattern_strings: tuple[str, ...]) -> "re.Pattern | None":
+    """Combine pattern strings into one alternation so content is scanned once.
+
+    Each member becomes a named group g<index>; the matched member is
+    recovered from Match.lastgroup.
+    """
+    if pattern_strings not in _fused_cache:
+        alternation = "|".join(
+            f"(?P<g{i}>{p})" for i, p in enumerate(pattern_strings)
+        )
+        try:
+            _fused_cache[pattern_strings] = compile_regex(
+                alternation, re.IGNORECASE | re.MULTILINE
+            )
+        except re.error:
+            _fused_cache[pattern_strings] = None
+    return _fused_cache[pattern_strings]
+
+
+@functools.lru_cache(maxsize=4)
+def _load_patterns_cached(path_str: str, mtime_ns: int) -> tuple:
+    """Parse and compile patterns.json, keyed by (path, mtime) for reuse."""
+    try:
+        data = _loads(Path(path_str).read_bytes())
+    except (ValueError, OSError):
+        return ()
+    return tuple(compile_patterns(data.get("patterns", [])))
+
+
 def load_patterns() -> list[dict]:
-    """Load anti-pattern definitions from reference/patterns.json."""
+    """Load anti-pattern definitions from reference/patterns.json.
+
+    Results are cached against the file's mtime so repeated calls within a
+    process (or a long-lived host) skip the disk read, JSON parse, and
+    regex compilation; editing the file invalidates the cache.
+    """
     patterns_file = get_plugin_dir() / "reference" / "patterns.json"
-    if not patterns_file.exists():
-        return []
     try:
-        data = json.loads(patterns_file.read_text())
-        return data.get("patterns", [])
-    except (json.JSONDecodeError, OSError):
+        st = patterns_file.stat()
+    except OSError:
         return []
+    return list(_load_patterns_cached(str(patterns_file), st.st_mtime_ns))
+
+
+# Largest content size scanned in full; above this the content is clamped
+# to a head+tail window. Tail-heavy split since generated files front-load
+# imports/boilerplate and the interesting edits tend to come later.
+# Override with GUARDIAN_MAX_OUTPUT; 0 disables the clamp.
+DEFAULT_MAX_SCAN = 32_000
+
+
+def bound_content(content: str) -> str:
+    """Clamp very large payloads to a bounded window before scanning."""
+    try:
+        limit = int(os.environ.get("GUARDIAN_MAX_OUTPUT", DEFAULT_MAX_SCAN))
+    except ValueError:
+        limit = DEFAULT_MAX_SCAN
+    if limit <= 0 or len(content) <= limit:
+        return content
+    head = limit // 4
+    tail = limit - head
+    return content[:head] + "\n...[truncated]...\n" + content[-tail:]
 
 
 def get_content(tool_input: dict) -> str:
@@ -60,37 +244,156 @@ def file_matches_globs(file_path: str, globs: list[str]) -> bool:
     return False
 
 
-def check_pattern(content: str, pattern_def: dict) -> dict | None:
-    """Check if content matches an anti-pattern. Returns violation info or None."""
-    pattern = pattern_def["pattern"]
-
-    # Check for exclusion pattern first
-    exclude_pattern = pattern_def.get("exclude_pattern")
-    if exclude_pattern:
-        exclude_matches = re.findall(exclude_pattern, content, re.IGNORECASE)
-        matches = re.findall(pattern, content, re.IGNORECASE)
-        if len(exclude_matches) >= len(matches):
+# Content size above which per-pattern scans are dispatched to a thread
+# pool (only reachable when GUARDIAN_MAX_OUTPUT raises or disables the
+# clamp). Worth it only under re2, which releases the GIL while matching;
+# stdlib re holds it, so threads would add overhead without concurrency.
+_PARALLEL_THRESHOLD = 256_000
+_executor: "concurrent.futures.ThreadPoolExecutor | None" = None
+
+
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Lazily create the shared scan pool (persistent under the daemon)."""
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+    return _executor
+
+
+def exts_with_rules(patterns: list[dict]) -> "frozenset[str] | None":
+    """Union of extensions the patterns apply to.
+
+    Returns None when any pattern is not limited to plain extensions
+    (applies everywhere or uses complex globs), in which case no
+    extension can be skipped wholesale.
+    """
+    exts: set[str] = set()
+    for pattern_def in patterns:
+        file_exts = pattern_def.get("file_exts")
+        if file_exts is None:
             return None
+        exts.update(file_exts)
+    return frozenset(exts)
 
-    if re.search(pattern, content, re.IGNORECASE | re.MULTILINE):
-        return {
-            "id": pattern_def["id"],
-            "message": pattern_def["message"],
-            "suggestion": pattern_def.get("suggestion", ""),
-            "severity": pattern_def.get("severity", "error"),
-        }
+
+def build_violation(pattern_def: dict) -> dict:
+    """Build the violation dict reported for a matched anti-pattern."""
+    return {
+        "id": pattern_def["id"],
+        "message": pattern_def["message"],
+        "suggestion": pattern_def.get("suggestion", ""),
+        "severity": pattern_def.get("severity", "error"),
+    }
+
+
+def check_pattern(content: str, pattern_def: dict) -> dict | None:
+    """Check if content matches an anti-pattern. Returns violation info or None."""
+    handler = pattern_def.get("handler")
+    if handler is not None:
+        return build_violation(pattern_def) if handler(content) else None
+
+    pattern_re = pattern_def["pattern_re"]
+
+    exclude_re = pattern_def.get("exclude_re")
+    if exclude_re is None:
+        if pattern_re.search(content):
+            return build_violation(pattern_def)
+        return None
+
+    # Judge each match against the exclusion pattern individually, using
+    # the window from the start of the match's line up to the match end so
+    # the exclusion can only be satisfied by this occurrence's own prefix
+    # (a commented-out mention on a neighbouring line no longer excuses a
+    # real violation, and one excluded occurrence no longer hides another).
+    for match in pattern_re.finditer(content):
+        line_start = content.rfind("\n", 0, match.start()) + 1
+        window = content[line_start:match.end()]
+        if exclude_re.search(window):
+            continue
+        return build_violation(pattern_def)
     return None
 
 
 def validate_content(content: str, file_path: str, patterns: list[dict]) -> list[dict]:
-    """Validate content against all anti-patterns."""
-    violations = []
-
+    """Validate content against all anti-patterns.
+
+    Patterns without an exclusion rule are checked in a single fused-regex
+    scan of the content; exclusion-carrying patterns keep their individual
+    match/exclude accounting.
+    """
+    # normcase mirrors fnmatch's own case handling (case-insensitive on
+    # Windows, identity elsewhere)
+    basename = os.path.normcase(os.path.basename(file_path))
+    file_ext = os.path.splitext(basename)[1]
+
+    # When every pattern is extension-bound and none covers this file's
+    # extension (.md, .json, .lock edits with the shipped config), skip
+    # the scan entirely.
+    if file_path:
+        known_exts = exts_with_rules(patterns)
+        if known_exts is not None and file_ext not in known_exts:
+            return []
+
+    content_lower = content.lower()
+
+    fusable = []
+    individual = []
     for pattern_def in patterns:
         file_globs = pattern_def.get("file_globs", [])
-        if file_globs and file_path and not file_matches_globs(file_path, file_globs):
+        if file_globs and file_path:
+            file_exts = pattern_def.get("file_exts")
+            globs_re = pattern_def.get("file_globs_re")
+            if file_exts is not None:
+                if file_ext not in file_exts:
+                    continue
+            elif globs_re is not None:
+                if globs_re.match(basename) is None:
+                    continue
+            elif not file_matches_globs(file_path, file_globs):
+                continue
+        # Substring prefilter: patterns are matched case-insensitively, so
+        # check lowered literals against lowered content.
+        literals = pattern_def.get("literals_lower")
+        if literals and not any(lit in content_lower for lit in literals):
             continue
+        if pattern_def.get("exclude_re") is not None or "handler" in pattern_def:
+            individual.append(pattern_def)
+        else:
+            fusable.append(pattern_def)
+
+    if (
+        re2 is not None
+        and len(content) > _PARALLEL_THRESHOLD
+        and len(fusable) + len(individual) > 1
+    ):
+        applicable = fusable + individual
+        results = _get_executor().map(
+            lambda pattern_def: check_pattern(content, pattern_def), applicable
+        )
+        return [violation for violation in results if violation]
+
+    fused_re = fuse_patterns(tuple(p["pattern"] for p in fusable)) if fusable else None
+    if fusable and fused_re is None:
+        individual = fusable + individual
+        fusable = []
+
+    matched_groups: set[str | None] = set()
+    if fusable:
+        for match in fused_re.finditer(content):
+            matched_groups.add(match.lastgroup)
 
+    violations = []
+    for i, pattern_def in enumerate(fusable):
+        if f"g{i}" in matched_groups:
+            violations.append(build_violation(pattern_def))
+        elif matched_groups and pattern_def["pattern_re"].search(content):
+            # finditer reports non-overlapping matches, so one pattern's
+            # match can swallow the span another would have matched (e.g.
+            # .dict() inside an f-string SELECT). When nothing matched at
+            # all the single pass is conclusive; otherwise confirm the
+            # unfired patterns individually.
+            violations.append(build_violation(pattern_def))
+    for pattern_def in individual:
         result = check_pattern(content, pattern_def)
         if result:
             violations.append(result)
@@ -98,55 +401,65 @@ def validate_content(content: str, file_path: str, patterns: list[dict]) -> list
     return violations
 
 
-def main():
-    """Main entry point for the hook."""
-    try:
-        input_data = json.load(sys.stdin)
+def handle(input_data: dict) -> dict:
+    """Validate one hook invocation and build the response dict.
 
-        tool_name = input_data.get("tool_name", "")
-        tool_input = input_data.get("tool_input", {})
+    Shared between the per-call script path and the guardian daemon.
+    """
+    tool_name = input_data.get("tool_name", "")
+    tool_input = input_data.get("tool_input", {})
 
-        if tool_name not in ("Edit", "Write"):
-            print(json.dumps({}))
-            return
+    if tool_name not in ("Edit", "Write"):
+        return {}
 
-        content = get_content(tool_input)
-        file_path = get_file_path(tool_input)
+    content = get_content(tool_input)
+    file_path = get_file_path(tool_input)
 
-        if not content:
-            print(json.dumps({}))
-            return
+    if not content:
+        return {}
 
-        patterns = load_patterns()
-        if not patterns:
-            print(json.dumps({}))
-            return
+    content = bound_content(content)
 
-        violations = validate_content(content, file_path, patterns)
+    patterns = load_patterns()
+    if not patterns:
+        return {}
 
-        if violations:
-            messages = []
-            for v in violations:
-                messages.append(f"[{v['id']}] {v['message']}")
-                if v["suggestion"]:
-                    messages.append(f"  Suggestion: {v['suggestion']}")
+    violations = validate_content(content, file_path, patterns)
+    if not violations:
+        return {}
 
-            reason = "Anti-pattern detected:\n" + "\n".join(messages)
+    messages = [
+        f"[{v['id']}] {v['message']}\n  Suggestion: {v['suggestion']}"
+        if v["suggestion"]
+        else f"[{v['id']}] {v['message']}"
+        for v in violations
+    ]
+    reason = "Anti-pattern detected:\n" + "\n".join(messages)
 
-            print(json.dumps({
-                "hookSpecificOutput": {
-                    "hookEventName": "PreToolUse",
-                    "permissionDecision": "deny",
-                    "permissionDecisionReason": reason,
-                }
-            }))
-        else:
-            print(json.dumps({}))
+    return {
+        "hookSpecificOutput": {
+            "hookEventName": "PreToolUse",
+            "permissionDecision": "deny",
+            "permissionDecisionReason": reason,
+        }
+    }
+
+
+def main():
+    """Main entry point for the hook."""
+    try:
+        input_data = _loads(sys.stdin.buffer.read())
+
+        response = query_daemon("pre_edit_validator", input_data)
+        if response is None:
+            response = handle(input_data)
+
+        sys.stdout.write(_dumps(response) + "\n")
 
     except json.JSONDecodeError:
-        print(json.dumps({}))
+        sys.stdout.write("{}\n")
     except Exception:
-        print(json.dumps({}))
+        sys.stdout.write("{}\n")
 
 
 if __name__ == "__main__":
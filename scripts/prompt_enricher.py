@@ -10,12 +10,15 @@ Input: JSON on stdin with session_id, transcript_path, cwd, etc.
 Output: JSON with hookSpecificOutput containing additionalContext
 """
 
+import functools
 import json
 import os
 import re
 import sys
 from pathlib import Path
 
+from guardian_client import dumps as _dumps, loads as _loads, query_daemon
+
 
 def get_plugin_dir() -> Path:
     """Get the plugin directory path via env var or relative path."""
@@ -25,66 +28,155 @@ def get_plugin_dir() -> Path:
     return Path(__file__).parent.parent
 
 
+def compile_intent_rules(rules: list[dict]) -> list[dict]:
+    """Pre-compile each rule's patterns so hook calls skip re-compilation.
+
+    Rules whose regexes fail to compile are dropped rather than failing
+    every subsequent detection.
+    """
+    compiled = []
+    for rule in rules:
+        patterns = rule.get("patterns", [])
+        if not patterns:
+            continue
+        try:
+            # One alternation per rule: the prompt is scanned once per
+            # intent instead of once per alternative pattern.
+            rule["combined_pattern"] = "|".join(f"(?:{p})" for p in patterns)
+            rule["combined_re"] = re.compile(rule["combined_pattern"], re.IGNORECASE)
+        except re.error:
+            continue
+        compiled.append(rule)
+    return compiled
+
+
+# Mega alternations across all rules, keyed by the tuple of per-rule
+# combined patterns. A None value records a failed fusion so detection
+# falls back to the per-rule scan.
+_mega_cache: dict[tuple[str, ...], "re.Pattern | None"] = {}
+
+
+def fuse_rules(rule_patterns: tuple[str, ...]) -> "re.Pattern | None":
+    """Combine every rule's pattern into one alternation.
+
+    Used as a negative fast path: if the fused pattern finds nothing, no
+    rule can match and the per-rule scans are skipped entirely. (It can't
+    *attribute* matches — a greedy match from one rule can swallow the
+    span another rule would have matched — so positives still go through
+    the per-rule pass.)
+    """
+    if rule_patterns not in _mega_cache:
+        alternation = "|".join(f"(?:{p})" for p in rule_patterns)
+        try:
+            _mega_cache[rule_patterns] = re.compile(alternation, re.IGNORECASE)
+        except re.error:
+            _mega_cache[rule_patterns] = None
+    return _mega_cache[rule_patterns]
+
+
+@functools.lru_cache(maxsize=4)
+def _load_intent_rules_cached(path_str: str, mtime_ns: int) -> tuple:
+    """Parse and compile intent-rules.json, keyed by (path, mtime) for reuse."""
+    try:
+        data = _loads(Path(path_str).read_bytes())
+    except (ValueError, OSError):
+        return ()
+    return tuple(compile_intent_rules(data.get("intents", [])))
+
+
 def load_intent_rules() -> list[dict]:
-    """Load intent detection rules from reference/intent-rules.json."""
+    """Load intent detection rules from reference/intent-rules.json.
+
+    Results are cached against the file's mtime so repeated calls within a
+    process (or a long-lived host) skip the disk read, JSON parse, and
+    regex compilation; editing the file invalidates the cache.
+    """
     rules_file = get_plugin_dir() / "reference" / "intent-rules.json"
-    if not rules_file.exists():
-        return []
     try:
-        data = json.loads(rules_file.read_text())
-        return data.get("intents", [])
-    except (json.JSONDecodeError, OSError):
+        st = rules_file.stat()
+    except OSError:
         return []
+    return list(_load_intent_rules_cached(str(rules_file), st.st_mtime_ns))
 
 
-def load_reference_file(filename: str, section_filter: str | None = None) -> str:
-    """Load content from a reference file, optionally filtering to a section."""
-    ref_path = get_plugin_dir() / "reference" / filename
-
-    if not ref_path.exists():
+@functools.lru_cache(maxsize=32)
+def _load_reference_cached(path_str: str, section_filter: "str | None", mtime_ns: int) -> str:
+    """Stream one reference file section, keyed by (path, section, mtime)."""
+    ref_path = Path(path_str)
+    section_lines: list[str] = []
+    head_lines: list[str] = []
+    in_section = False
+    try:
+        with ref_path.open(encoding="utf-8") as f:
+            for raw in f:
+                line = raw.removesuffix("\n")
+                if section_filter:
+                    if line.startswith("## ") and section_filter.lower() in line.lower():
+                        in_section = True
+                        section_lines.append(line)
+                        continue
+                    if line.startswith("## ") and in_section:
+                        break
+                    if in_section:
+                        section_lines.append(line)
+                        continue
+                # Head lines double as the fallback when the section is
+                # never found.
+                if len(head_lines) < 100:
+                    head_lines.append(line)
+                elif not section_filter:
+                    break
+    except OSError:
         return ""
 
-    content = ref_path.read_text()
+    if section_lines:
+        return "\n".join(section_lines)
 
-    if section_filter:
-        lines = content.split("\n")
-        in_section = False
-        section_lines = []
-
-        for line in lines:
-            if line.startswith("## ") and section_filter.lower() in line.lower():
-                in_section = True
-                section_lines.append(line)
-            elif line.startswith("## ") and in_section:
-                break
-            elif in_section:
-                section_lines.append(line)
+    # Return first 100 lines if no filter or section not found
+    return "\n".join(head_lines)
 
-        if section_lines:
-            return "\n".join(section_lines)
 
-    # Return first 100 lines if no filter or section not found
-    lines = content.split("\n")[:100]
-    return "\n".join(lines)
+def load_reference_file(filename: str, section_filter: str | None = None) -> str:
+    """Load content from a reference file, optionally filtering to a section.
+
+    Streams the file line by line and stops as soon as the requested
+    section ends (or, without a filter, after 100 lines). Results are
+    memoized against the file's mtime, so two intents referencing the
+    same file and section within a call (or across daemon-served calls)
+    share one read.
+    """
+    ref_path = get_plugin_dir() / "reference" / filename
+    try:
+        st = ref_path.stat()
+    except OSError:
+        return ""
+    return _load_reference_cached(str(ref_path), section_filter, st.st_mtime_ns)
 
 
 def detect_intents(prompt: str, rules: list[dict]) -> list[dict]:
-    """Detect user intent from prompt text using configurable rules."""
-    prompt_lower = prompt.lower()
-    matched = []
-
-    for rule in rules:
-        for pattern in rule.get("patterns", []):
-            if re.search(pattern, prompt_lower):
-                matched.append(rule)
-                break
+    """Detect user intent from prompt text using configurable rules.
+
+    All rules are fused into a single alternation when possible, so one
+    pass over the prompt collects every matched rule; otherwise each
+    rule's combined pattern is tried in turn.
+    """
+    # Case folding happens in the regex engine (IGNORECASE) rather than by
+    # materializing a lowercased copy of the whole prompt.
+    mega = fuse_rules(tuple(r["combined_pattern"] for r in rules)) if rules else None
+    if mega is not None and mega.search(prompt) is None:
+        return []
 
-    return matched
+    return [rule for rule in rules if rule["combined_re"].search(prompt)]
 
 
 def build_enrichment(intents: list[dict]) -> str:
-    """Build enrichment context from matched intents."""
-    sections = []
+    """Build enrichment context from matched intents.
+
+    Accumulates every piece (including separators) into one flat list and
+    joins once at the end, instead of materializing an intermediate
+    string per intent and joining again.
+    """
+    pieces: list[str] = []
 
     for intent in intents:
         parts = []
@@ -103,52 +195,59 @@ def build_enrichment(intents: list[dict]) -> str:
                 parts.append(ref_content)
 
         if parts:
-            sections.append("\n\n".join(parts))
+            if pieces:
+                pieces.append("\n\n---\n\n")
+            pieces.append("\n\n".join(parts))
 
-    if sections:
-        return "\n\n---\n\n".join(sections)
-    return ""
+    return "".join(pieces)
 
 
-def main():
-    """Main entry point for the hook."""
-    try:
-        input_data = json.load(sys.stdin)
+def handle(input_data: dict) -> dict:
+    """Enrich one prompt submission and build the response dict.
+
+    Shared between the per-call script path and the guardian daemon.
+    """
+    # UserPromptSubmit provides the prompt in "prompt"
+    prompt = input_data.get("prompt", "")
+
+    if not prompt:
+        return {}
 
-        # UserPromptSubmit provides the prompt in "prompt"
-        prompt = input_data.get("prompt", "")
+    rules = load_intent_rules()
+    if not rules:
+        return {}
 
-        if not prompt:
-            print(json.dumps({}))
-            return
+    intents = detect_intents(prompt, rules)
+    if not intents:
+        return {}
 
-        rules = load_intent_rules()
-        if not rules:
-            print(json.dumps({}))
-            return
+    enrichment = build_enrichment(intents)
+    if not enrichment:
+        return {}
 
-        intents = detect_intents(prompt, rules)
+    return {
+        "hookSpecificOutput": {
+            "hookEventName": "UserPromptSubmit",
+            "additionalContext": f"## Project Conventions (clean-code-guardian)\n\n{enrichment}",
+        }
+    }
 
-        if not intents:
-            print(json.dumps({}))
-            return
 
-        enrichment = build_enrichment(intents)
+def main():
+    """Main entry point for the hook."""
+    try:
+        input_data = _loads(sys.stdin.buffer.read())
+
+        response = query_daemon("prompt_enricher", input_data)
+        if response is None:
+            response = handle(input_data)
 
-        if enrichment:
-            print(json.dumps({
-                "hookSpecificOutput": {
-                    "hookEventName": "UserPromptSubmit",
-                    "additionalContext": f"## Project Conventions (clean-code-guardian)\n\n{enrichment}",
-                }
-            }))
-        else:
-            print(json.dumps({}))
+        sys.stdout.write(_dumps(response) + "\n")
 
     except json.JSONDecodeError:
-        print(json.dumps({}))
+        sys.stdout.write("{}\n")
     except Exception:
-        print(json.dumps({}))
+        sys.stdout.write("{}\n")
 
 
 if __name__ == "__main__":